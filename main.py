@@ -1,6 +1,18 @@
 import os
+import asyncio
+import hashlib
+import sqlite3
+import string
 import logging
-from typing import Dict, List
+import threading
+import unicodedata
+import weakref
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from bs4 import BeautifulSoup
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -9,12 +21,14 @@ from telegram.ext import (
     MessageHandler,
     CallbackQueryHandler,
     ContextTypes,
-    ConversationHandler,
     filters,
 )
 from telegram.constants import ParseMode
-from deep_translator import GoogleTranslator
-import re
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 # Enable logging
 logging.basicConfig(
@@ -25,12 +39,96 @@ logger = logging.getLogger(__name__)
 # Load bot token from environment variable for security
 TOKEN = os.getenv("SLUGIFY_BOT_TOKEN")
 
-# Define conversation states
-AWAITING_SEPARATOR, AWAITING_TEXT = range(2)
+# Webhook settings; the bot falls back to polling when no webhook URL is set
+WEBHOOK_URL = os.getenv("SLUGIFY_WEBHOOK_URL")
+WEBHOOK_PORT = int(os.getenv("SLUGIFY_WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("SLUGIFY_WEBHOOK_SECRET")
+
+def _build_bytes_table(separator: str) -> bytes:
+    """Build a bytes table that lowercases ASCII letters and maps spaces to the separator."""
+    return bytes.maketrans(
+        (string.ascii_uppercase + " ").encode(), (string.ascii_lowercase + separator).encode()
+    )
+
+# Separators a user may choose in /settings
+SEPARATORS = ("-", "_")
+
+# Slug tables for each allowed separator, used with bytes.translate
+_BYTES_TABLES = {separator: _build_bytes_table(separator) for separator in SEPARATORS}
+_BYTES_KEEP = (string.ascii_letters + string.digits + "-_ ").encode()
+_BYTES_DELETE = bytes(c for c in range(256) if c not in _BYTES_KEEP)
+
+# Zero-width characters that make equal-looking headlines differ
+_ZERO_WIDTH_TABLE = str.maketrans("", "", "\u200b\u200c\u200d\u2060\ufeff")
+
+class TranslationNotFound(Exception):
+    """Raised when the translator response contains no translation."""
+
+# Google Translate endpoint, shared by all requests through one pooled client
+GOOGLE_TRANSLATE_URL = "https://translate.google.com/m"
+TARGET_LANGUAGE = "en"
+TRANSLATE_TIMEOUT = 10.0  # seconds, for the whole translation call
+http_client: Optional[httpx.AsyncClient] = None
+
+# Cap on concurrent translation requests, to stay under Google's rate limit;
+# the semaphore is created in post_init so it belongs to the running loop
+MAX_CONCURRENT_TRANSLATIONS = 5
+translation_semaphore: Optional[asyncio.Semaphore] = None
+
+# Translation cache
+CACHE_SIZE = 10_000
+translation_cache: "OrderedDict[str, str]" = OrderedDict()
+
+# Persistent translation cache that survives restarts
+TRANSLATIONS_DB = os.getenv("SLUGIFY_TRANSLATIONS_DB", "translations.db")
+translations_db: Optional[sqlite3.Connection] = None
+translations_db_lock = threading.Lock()
+
+# Translations in flight, so concurrent requests for a headline share one call
+pending_translations: Dict[str, "asyncio.Task[str]"] = {}
 
 # User session storage
+HISTORY_SIZE = 5
 user_data: Dict[int, Dict] = {}
 
+# Sharded per-user locks that guard changes to user_data while updates run
+# concurrently; they are never held across network calls and are created in
+# post_init so they belong to the running loop
+USER_LOCK_SHARDS = 64
+user_locks: List[asyncio.Lock] = []
+
+def _lock_for(user_id: int) -> asyncio.Lock:
+    """Return the lock shard for the user."""
+    return user_locks[user_id % USER_LOCK_SHARDS]
+
+# Per-chat locks that keep replies in the order messages were sent; a lock is
+# dropped once no handler for its chat holds it
+chat_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def _chat_lock(chat_id: int) -> asyncio.Lock:
+    """Return the lock for the chat, creating it if needed."""
+    lock = chat_locks.get(chat_id)
+    if lock is None:
+        lock = chat_locks[chat_id] = asyncio.Lock()
+    return lock
+
+# Keyboards are built once and shared by every reply
+_RESULT_MARKUP = InlineKeyboardMarkup(
+    [
+        [
+            InlineKeyboardButton("♻️ Retranslate", callback_data="retranslate"),
+            InlineKeyboardButton("🛠 Customize", callback_data="customize"),
+        ],
+        [InlineKeyboardButton("📋 Copy Slug", callback_data="copy_slug")],
+    ]
+)
+_SETTINGS_MARKUP = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("Change Separator", callback_data="change_separator")],
+        [InlineKeyboardButton("Reset Preferences", callback_data="reset_preferences")],
+    ]
+)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /start command."""
     user = update.effective_user
@@ -59,13 +157,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 async def settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /settings command."""
-    keyboard = [
-        [InlineKeyboardButton("Change Separator", callback_data="change_separator")],
-        [InlineKeyboardButton("Reset Preferences", callback_data="reset_preferences")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text(
-        "📐 Settings\n\nCustomize your slugify preferences:", reply_markup=reply_markup
+        "📐 Settings\n\nCustomize your slugify preferences:", reply_markup=_SETTINGS_MARKUP
     )
 
 async def history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -76,53 +169,135 @@ async def history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     history_text = "📜 Your recent translations:\n\n"
-    for item in user_data[user_id]["history"][-5:]:  # Show last 5 items
+    for item in user_data[user_id]["history"]:
         history_text += f"Original: {item['original']}\nSlug: {item['slug']}\n\n"
     
     await update.message.reply_text(history_text)
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle user messages."""
-    user_id = update.effective_user.id
-    headline = update.message.text.strip()
+    async with _chat_lock(update.effective_chat.id):
+        user_id = update.effective_user.id
+        if user_data.get(user_id, {}).get("awaiting_separator"):
+            await set_separator(update, context)
+            return
 
-    if user_id not in user_data:
-        user_data[user_id] = {"separator": "-"}
+        headline = update.message.text.strip()
 
-    try:
-        formatted_headline = await translate_and_format(headline, user_data[user_id]["separator"])
-        
-        # Store in history
-        if "history" not in user_data[user_id]:
-            user_data[user_id]["history"] = []
-        user_data[user_id]["history"].append({"original": headline, "slug": formatted_headline})
-        
-        keyboard = [
-            [
-                InlineKeyboardButton("♻️ Retranslate", callback_data="retranslate"),
-                InlineKeyboardButton("🛠 Customize", callback_data="customize"),
-            ],
-            [InlineKeyboardButton("📋 Copy Slug", callback_data="copy_slug")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        await update.message.reply_text(
-            f"🔗 Slug: `{formatted_headline}`",
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
+        async with _lock_for(user_id):
+            separator = user_data.setdefault(user_id, {"separator": "-"})["separator"]
+
+        try:
+            formatted_headline = await translate_and_format(headline, separator)
+
+            # Store in history
+            async with _lock_for(user_id):
+                data = user_data.setdefault(user_id, {"separator": "-"})
+                if "history" not in data:
+                    data["history"] = deque(maxlen=HISTORY_SIZE)
+                data["history"].append({"original": headline, "slug": formatted_headline})
+
+            await update.message.reply_text(
+                f"🔗 Slug: `{formatted_headline}`",
+                parse_mode=ParseMode.MARKDOWN,
+                reply_markup=_RESULT_MARKUP,
+            )
+        except Exception as e:
+            logger.error(f"Error processing message: {e}")
+            await update.message.reply_text("❌ An error occurred. Please try again later.")
+
+async def _translate_async(headline: str) -> str:
+    """Translate the headline to English with the shared HTTP client."""
+    async with translation_semaphore:
+        response = await http_client.get(
+            GOOGLE_TRANSLATE_URL, params={"tl": TARGET_LANGUAGE, "sl": "auto", "q": headline}
         )
-    except Exception as e:
-        logger.error(f"Error processing message: {e}")
-        await update.message.reply_text("❌ An error occurred. Please try again later.")
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.text, "html.parser")
+    element = soup.find("div", {"class": "t0"}) or soup.find("div", {"class": "result-container"})
+    if element is None:
+        raise TranslationNotFound(f"No translation found for {headline!r}")
+    return element.get_text(strip=True)
+
+def _open_translations_db(path: str) -> sqlite3.Connection:
+    """Open the translation database, creating the table if needed."""
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS translations ("
+        "key BLOB, lang TEXT, text TEXT, PRIMARY KEY (key, lang)"
+        ") WITHOUT ROWID"
+    )
+    return db
+
+def _load_translation(headline: str) -> Optional[str]:
+    """Look up a stored translation of the headline."""
+    key = hashlib.sha1(headline.encode()).digest()
+    with translations_db_lock:
+        row = translations_db.execute(
+            "SELECT text FROM translations WHERE key = ? AND lang = ?", (key, TARGET_LANGUAGE)
+        ).fetchone()
+    return row[0] if row else None
+
+def _store_translation(headline: str, translated_text: str) -> None:
+    """Store the translation of the headline."""
+    key = hashlib.sha1(headline.encode()).digest()
+    with translations_db_lock, translations_db:
+        translations_db.execute(
+            "INSERT OR IGNORE INTO translations (key, lang, text) VALUES (?, ?, ?)",
+            (key, TARGET_LANGUAGE, translated_text),
+        )
+
+async def _fetch_translation(headline: str) -> str:
+    """Translate the headline, consulting the persistent cache first."""
+    # SQLite calls run in a worker thread so disk I/O never blocks the event loop
+    translated_text = await asyncio.to_thread(_load_translation, headline)
+    if translated_text is None:
+        # Bound the whole call, including the semaphore wait and a slow response body
+        translated_text = await asyncio.wait_for(_translate_async(headline), TRANSLATE_TIMEOUT)
+        await asyncio.to_thread(_store_translation, headline, translated_text)
+
+    translation_cache[headline] = translated_text
+    if len(translation_cache) > CACHE_SIZE:
+        translation_cache.popitem(last=False)
+    return translated_text
+
+async def _translate_cached(headline: str) -> str:
+    """Translate the headline to English, caching repeated headlines."""
+    if headline in translation_cache:
+        translation_cache.move_to_end(headline)
+        return translation_cache[headline]
+
+    # Identical headlines arriving together wait on the same translation
+    task = pending_translations.get(headline)
+    if task is None:
+        task = asyncio.create_task(_fetch_translation(headline))
+        pending_translations[headline] = task
+        task.add_done_callback(lambda _: pending_translations.pop(headline, None))
+    return await asyncio.shield(task)
+
+def _needs_translation(headline: str) -> bool:
+    """Check whether the headline has non-ASCII letters or digits to translate."""
+    # ASCII headlines are already English, and emoji or symbols can't be translated
+    if headline.isascii():
+        return False
+    return any(c.isalnum() for c in headline if not c.isascii())
 
 async def translate_and_format(headline: str, separator: str = "-") -> str:
     """Translate and format the headline."""
     try:
-        translator = GoogleTranslator(source='auto', target='en')
-        translated_text = translator.translate(headline)
-        slugified_text = translated_text.lower().replace(" ", separator)
-        slugified_text = re.sub(r"[^a-zA-Z0-9\-_]", "", slugified_text)
-        return slugified_text
+        # Canonicalize the headline so equal-looking headlines share a cache entry
+        headline = unicodedata.normalize("NFC", headline).translate(_ZERO_WIDTH_TABLE)
+        if _needs_translation(headline):
+            translated_text = await _translate_cached(headline)
+        else:
+            translated_text = headline
+        # Slugs are pure ASCII, so non-ASCII characters are dropped while encoding
+        return translated_text.encode("ascii", "ignore").translate(
+            _BYTES_TABLES[separator], _BYTES_DELETE
+        ).decode("ascii")
     except Exception as e:
         logger.error(f"Translation error: {e}")
         raise e
@@ -130,70 +305,105 @@ async def translate_and_format(headline: str, separator: str = "-") -> str:
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle button callbacks."""
     query = update.callback_query
+    user_id = update.effective_user.id
     await query.answer()
 
     if query.data == "retranslate":
         await query.edit_message_text("🔄 Please send the text again for retranslation.")
     elif query.data == "customize":
+        async with _lock_for(user_id):
+            user_data.setdefault(user_id, {"separator": "-"})["awaiting_separator"] = True
         await query.edit_message_text("🛠 Please send the separator you'd like (e.g., '_' or '-').")
-        return AWAITING_SEPARATOR
     elif query.data == "copy_slug":
         # In a real bot, you'd implement clipboard functionality here
         await query.edit_message_text("📋 Slug copied to clipboard! (simulated)")
     elif query.data == "change_separator":
+        async with _lock_for(user_id):
+            user_data.setdefault(user_id, {"separator": "-"})["awaiting_separator"] = True
         await query.edit_message_text("🔧 Please enter your preferred separator (e.g., '_' or '-'):")
-        return AWAITING_SEPARATOR
     elif query.data == "reset_preferences":
-        user_id = update.effective_user.id
-        user_data[user_id] = {"separator": "-"}
+        async with _lock_for(user_id):
+            user_data[user_id] = {"separator": "-"}
         await query.edit_message_text("🔄 Your preferences have been reset to default.")
 
-async def set_separator(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def set_separator(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Set the user's preferred separator."""
     user_id = update.effective_user.id
     new_separator = update.message.text.strip()
 
-    if len(new_separator) != 1 or new_separator not in ("-", "_"):
+    if new_separator not in SEPARATORS:
         await update.message.reply_text("❌ Invalid separator. Please use '-' or '_'.")
-        return AWAITING_SEPARATOR
+        return
 
-    user_data[user_id]["separator"] = new_separator
+    async with _lock_for(user_id):
+        data = user_data.setdefault(user_id, {})
+        data["separator"] = new_separator
+        data["awaiting_separator"] = False
     await update.message.reply_text(f"✅ Separator set to '{new_separator}'. You can now send me a headline to slugify!")
-    return ConversationHandler.END
 
-async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Cancel the conversation."""
+async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Cancel a pending separator change."""
+    user_id = update.effective_user.id
+    async with _lock_for(user_id):
+        if user_id in user_data:
+            user_data[user_id]["awaiting_separator"] = False
     await update.message.reply_text("Operation cancelled. How else can I help you?")
-    return ConversationHandler.END
+
+async def post_init(application: Application) -> None:
+    """Create the asyncio primitives and open the HTTP client and translation database."""
+    global http_client, translations_db, translation_semaphore
+    translation_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TRANSLATIONS)
+    user_locks[:] = [asyncio.Lock() for _ in range(USER_LOCK_SHARDS)]
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=32),
+        timeout=httpx.Timeout(TRANSLATE_TIMEOUT),
+    )
+    translations_db = _open_translations_db(TRANSLATIONS_DB)
+
+async def post_shutdown(application: Application) -> None:
+    """Close the HTTP client and translation database."""
+    await http_client.aclose()
+    translations_db.close()
 
 def main() -> None:
     """Run the bot."""
-    application = Application.builder().token(TOKEN).build()
+    if uvloop is not None:
+        uvloop.install()
+
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .concurrent_updates(True)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Command handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("settings", settings))
     application.add_handler(CommandHandler("history", history))
+    application.add_handler(CommandHandler("cancel", cancel))
 
-    # Message handler
+    # Message handler; also receives the separator while one is awaited
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
 
     # Callback query handler
     application.add_handler(CallbackQueryHandler(button_callback))
 
-    # Conversation handler for setting separator
-    conv_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(button_callback, pattern="^customize$|^change_separator$")],
-        states={
-            AWAITING_SEPARATOR: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_separator)],
-        },
-        fallbacks=[CommandHandler("cancel", cancel)],
-    )
-    application.add_handler(conv_handler)
-
     # Start the bot
-    application.run_polling()
+    if WEBHOOK_URL:
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=WEBHOOK_PORT,
+            url_path=urlparse(WEBHOOK_URL).path.lstrip("/"),
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+        )
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
     main()